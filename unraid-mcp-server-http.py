@@ -5,19 +5,37 @@ Works properly in Docker containers with HTTP transport.
 """
 import os
 import sys
-import json
 import logging
-import httpx
+import orjson
 import asyncio
-from pathlib import Path
+import time
+from collections import Counter
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from hashlib import md5
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
+from unraid_mcp_core import (
+    PAYLOAD_ARRAY,
+    PAYLOAD_DASHBOARD,
+    PAYLOAD_DOCKER,
+    PAYLOAD_DOCKER_PORTS,
+    PAYLOAD_HEALTH,
+    PAYLOAD_SYSTEM_INFO,
+    close_client,
+    graphql_raw,
+    graphql_raw_partial,
+    init_client,
+    summarize_array,
+    summarize_docker,
+    summarize_system_info,
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -26,6 +44,7 @@ UNRAID_API_URL = os.getenv("UNRAID_API_URL")
 UNRAID_API_KEY = os.getenv("UNRAID_API_KEY")
 PORT = int(os.getenv("UNRAID_MCP_PORT", "6970"))
 HOST = os.getenv("UNRAID_MCP_HOST", "0.0.0.0")
+VERIFY_SSL = os.getenv("UNRAID_VERIFY_SSL", "true").lower() not in {"false", "0", "no"}
 
 # Logging setup
 logging.basicConfig(
@@ -38,57 +57,82 @@ if not UNRAID_API_URL or not UNRAID_API_KEY:
     logger.error("UNRAID_API_URL and UNRAID_API_KEY must be set")
     sys.exit(1)
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared HTTP client on startup and close it on shutdown"""
+    logger.info(f"Unraid MCP Server starting on {HOST}:{PORT}")
+    logger.info(f"API URL: {UNRAID_API_URL}")
+
+    init_client(UNRAID_API_URL, UNRAID_API_KEY, verify_ssl=VERIFY_SSL)
+    flush_task = asyncio.create_task(_flush_request_counts())
+    logger.info("Server ready!")
+    try:
+        yield
+    finally:
+        flush_task.cancel()
+        await close_client()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Unraid MCP Server",
     description="HTTP-based MCP Server for Unraid API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-async def make_graphql_request(query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """Helper function to make GraphQL requests to the Unraid API."""
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": UNRAID_API_KEY,
-    }
-    payload = {"query": query}
-    if variables:
-        payload["variables"] = variables
+# Aggregated access log: (path, status) -> count, flushed every _ACCESS_LOG_INTERVAL seconds
+_ACCESS_LOG_INTERVAL = 5
+_REQUEST_COUNTS: Counter = Counter()
 
-    logger.debug(f"Making GraphQL request to {UNRAID_API_URL}")
-    
-    verify_ssl = os.getenv("UNRAID_VERIFY_SSL", "true").lower() not in ["false", "0", "no"]
-    
-    async with httpx.AsyncClient(verify=verify_ssl, timeout=30.0) as client:
-        response = await client.post(UNRAID_API_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        if "errors" in response_data and response_data["errors"]:
-            error_details = "; ".join([err.get("message", str(err)) for err in response_data["errors"]])
-            raise Exception(f"GraphQL API error: {error_details}")
-        
-        return response_data.get("data", {})
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    """Count requests instead of writing an access log line for each one"""
+    try:
+        response = await call_next(request)
+    except Exception:
+        # Unhandled errors surface as 500s; count them so they still show up in the logs
+        _REQUEST_COUNTS[(request.url.path, 500)] += 1
+        raise
+    _REQUEST_COUNTS[(request.url.path, response.status_code)] += 1
+    return response
+
+async def _flush_request_counts():
+    """Periodically log and reset the aggregated request counts"""
+    while True:
+        await asyncio.sleep(_ACCESS_LOG_INTERVAL)
+        if _REQUEST_COUNTS:
+            counts = ", ".join(f"{path} {status} x{n}" for (path, status), n in sorted(_REQUEST_COUNTS.items()))
+            _REQUEST_COUNTS.clear()
+            logger.info(f"Requests in last {_ACCESS_LOG_INTERVAL}s: {counts}")
+
+# One-slot memo of (unix second, ISO timestamp) so frequent health polls reuse the string
+_ts_cache = [0, ""]
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, at one-second resolution"""
+    s = int(time.time())
+    if s != _ts_cache[0]:
+        _ts_cache[:] = [s, datetime.fromtimestamp(s, timezone.utc).isoformat()]
+    return _ts_cache[1]
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         # Test connection to Unraid API
-        query = """
-        query HealthCheck {
-          info {
-            machineId
-            time
-          }
-        }
-        """
-        
-        response_data = await make_graphql_request(query)
+        response_data = await graphql_raw(PAYLOAD_HEALTH)
         
         return {
             "status": "healthy",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _now_iso(),
             "server": "Unraid MCP Server HTTP",
             "version": "1.0.0",
             "api_connection": "ok",
@@ -100,94 +144,121 @@ async def health_check():
 
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": _now_iso(),
                 "error": str(e)
             }
         )
 
+# Static bodies for / and /tools, encoded once at import time
+_ROOT_BODY = orjson.dumps({
+    "name": "Unraid MCP Server",
+    "version": "1.0.0",
+    "transport": "HTTP",
+    "endpoints": {
+        "/health": "Health check",
+        "/system-info": "Get system information",
+        "/array-status": "Get array status",
+        "/docker/containers": "List Docker containers (?include=ports for port mappings)",
+        "/dashboard": "Get system, array and Docker status in one call",
+        "/tools": "List available tools"
+    }
+})
+
+_TOOLS_BODY = orjson.dumps({
+    "tools": [
+        {
+            "name": "get_system_info",
+            "description": "Get comprehensive Unraid system information including OS, CPU, and memory details"
+        },
+        {
+            "name": "get_array_status",
+            "description": "Get current status of the Unraid storage array including capacity and disk health"
+        },
+        {
+            "name": "list_docker_containers",
+            "description": "List all Docker containers running on the Unraid system"
+        },
+        {
+            "name": "health_check",
+            "description": "Check the health status of the Unraid MCP server and system"
+        }
+    ]
+})
+
+def _etag(body: bytes) -> str:
+    return f'"{md5(body).hexdigest()}"'
+
+_ROOT_ETAG = _etag(_ROOT_BODY)
+_TOOLS_ETAG = _etag(_TOOLS_BODY)
+
+def _json_with_etag(request: Request, body: bytes, etag: str) -> Response:
+    """Return body with its ETag, or an empty 304 if the client already has it"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint with server info"""
-    return {
-        "name": "Unraid MCP Server",
-        "version": "1.0.0",
-        "transport": "HTTP",
-        "endpoints": {
-            "/health": "Health check",
-            "/system-info": "Get system information",
-            "/array-status": "Get array status",
-            "/docker/containers": "List Docker containers",
-            "/tools": "List available tools"
-        }
-    }
+    return _json_with_etag(request, _ROOT_BODY, _ROOT_ETAG)
 
 @app.get("/tools")
-async def list_tools():
+async def list_tools(request: Request):
     """List available MCP tools"""
-    return {
-        "tools": [
-            {
-                "name": "get_system_info",
-                "description": "Get comprehensive Unraid system information including OS, CPU, and memory details"
-            },
-            {
-                "name": "get_array_status", 
-                "description": "Get current status of the Unraid storage array including capacity and disk health"
-            },
-            {
-                "name": "list_docker_containers",
-                "description": "List all Docker containers running on the Unraid system"
-            },
-            {
-                "name": "health_check",
-                "description": "Check the health status of the Unraid MCP server and system"
-            }
-        ]
-    }
+    return _json_with_etag(request, _TOOLS_BODY, _TOOLS_ETAG)
+
+# One-slot memo of (raw info the body was built from, encoded body, ETag)
+_system_info_body = [None, b"", ""]
+
+async def _system_info_raw() -> Dict[str, Any]:
+    """Fetch raw system information; the summary is built by the caller"""
+    response_data = await graphql_raw(PAYLOAD_SYSTEM_INFO, cache_ttl=30)
+    raw_info = response_data.get("info", {})
+
+    if not raw_info:
+        raise HTTPException(status_code=404, detail="No system info returned from Unraid API")
+
+    return raw_info
+
+async def _array_status_data() -> Dict[str, Any]:
+    """Fetch array status and build its summary"""
+    response_data = await graphql_raw(PAYLOAD_ARRAY, cache_ttl=10)
+    raw_array_info = response_data.get("array", {})
+
+    if not raw_array_info:
+        raise HTTPException(status_code=404, detail="No array information returned from Unraid API")
+
+    return {"summary": summarize_array(raw_array_info), "details": raw_array_info}
+
+async def _docker_data(include_ports: bool = False) -> Dict[str, Any]:
+    """Fetch Docker containers and build their summary"""
+    payload = PAYLOAD_DOCKER_PORTS if include_ports else PAYLOAD_DOCKER
+    response_data = await graphql_raw(payload, cache_ttl=5)
+
+    if response_data.get("docker"):
+        return summarize_docker(response_data["docker"].get("containers") or [])
+
+    return {"summary": {"total": 0, "running": 0, "stopped": 0}, "containers": []}
 
 @app.get("/system-info")
-async def get_system_info():
+async def get_system_info(request: Request):
     """Get comprehensive system information"""
-    query = """
-    query GetSystemInfo {
-      info {
-        os { platform distro release hostname uptime }
-        cpu { manufacturer brand cores threads }
-        time
-        machineId
-        versions { unraid }
-      }
-    }
-    """
-    
     try:
         logger.info("Getting system information")
-        response_data = await make_graphql_request(query)
-        raw_info = response_data.get("info", {})
-        
-        if not raw_info:
-            raise HTTPException(status_code=404, detail="No system info returned from Unraid API")
-
-        # Process for human-readable output
-        summary = {}
-        if raw_info.get('os'):
-            os_info = raw_info['os']
-            summary['os'] = f"{os_info.get('distro', '')} {os_info.get('release', '')} ({os_info.get('platform', '')})"
-            summary['hostname'] = os_info.get('hostname')
-            summary['uptime'] = os_info.get('uptime')
-        
-        if raw_info.get('cpu'):
-            cpu_info = raw_info['cpu']
-            summary['cpu'] = f"{cpu_info.get('manufacturer', '')} {cpu_info.get('brand', '')} ({cpu_info.get('cores')} cores, {cpu_info.get('threads')} threads)"
+        raw_info = await _system_info_raw()
 
-        if raw_info.get('versions'):
-            summary['unraid_version'] = raw_info['versions'].get('unraid')
-
-        return {"summary": summary, "details": raw_info}
+        # Summarize and re-encode only when the cached GraphQL data has been refreshed
+        if raw_info is not _system_info_body[0]:
+            body = orjson.dumps({"summary": summarize_system_info(raw_info), "details": raw_info})
+            _system_info_body[:] = [raw_info, body, _etag(body)]
+        return _json_with_etag(request, _system_info_body[1], _system_info_body[2])
 
     except Exception as e:
         logger.error(f"Error in get_system_info: {e}")
@@ -196,106 +267,71 @@ async def get_system_info():
 @app.get("/array-status")
 async def get_array_status():
     """Get array status information"""
-    query = """
-    query GetArrayStatus {
-      array {
-        state
-        capacity {
-          kilobytes { free used total }
-        }
-        disks { id name status }
-        parities { id name status }
-      }
-    }
-    """
-    
     try:
         logger.info("Getting array status")
-        response_data = await make_graphql_request(query)
-        raw_array_info = response_data.get("array", {})
-        
-        if not raw_array_info:
-            raise HTTPException(status_code=404, detail="No array information returned from Unraid API")
-
-        summary = {
-            'state': raw_array_info.get('state'),
-            'num_data_disks': len(raw_array_info.get('disks', [])),
-            'num_parity_disks': len(raw_array_info.get('parities', []))
-        }
-
-        # Add capacity info if available
-        if raw_array_info.get('capacity') and raw_array_info['capacity'].get('kilobytes'):
-            kb_cap = raw_array_info['capacity']['kilobytes']
-            def format_kb(k):
-                if k is None: return "N/A"
-                k = int(k)
-                if k >= 1024*1024*1024: return f"{k / (1024*1024*1024):.2f} TB"
-                if k >= 1024*1024: return f"{k / (1024*1024):.2f} GB"
-                if k >= 1024: return f"{k / 1024:.2f} MB"
-                return f"{k} KB"
-
-            summary['capacity'] = {
-                'total': format_kb(kb_cap.get('total')),
-                'used': format_kb(kb_cap.get('used')),
-                'free': format_kb(kb_cap.get('free'))
-            }
-
-        return {"summary": summary, "details": raw_array_info}
+        return await _array_status_data()
 
     except Exception as e:
         logger.error(f"Error in get_array_status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve array status: {str(e)}")
 
 @app.get("/docker/containers")
-async def list_docker_containers():
-    """List Docker containers"""
-    query = """
-    query ListDockerContainers {
-      docker {
-        containers(skipCache: false) {
-          id
-          names
-          image
-          state
-          status
-          ports { privatePort publicPort type }
-        }
-      }
-    }
-    """
-    
+async def list_docker_containers(include: Optional[str] = None):
+    """List Docker containers; pass ?include=ports to add port mappings"""
     try:
         logger.info("Listing Docker containers")
-        response_data = await make_graphql_request(query)
-        
-        if response_data.get("docker"):
-            containers = response_data["docker"].get("containers", [])
-            
-            # Add summary
-            running = len([c for c in containers if c.get("state") == "running"])
-            stopped = len([c for c in containers if c.get("state") == "exited"])
-            
-            return {
-                "summary": {
-                    "total": len(containers),
-                    "running": running,
-                    "stopped": stopped
-                },
-                "containers": containers
-            }
-        
-        return {"summary": {"total": 0, "running": 0, "stopped": 0}, "containers": []}
+        include_ports = bool(include) and "ports" in include.split(",")
+        return await _docker_data(include_ports)
 
     except Exception as e:
         logger.error(f"Error in list_docker_containers: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list Docker containers: {str(e)}")
 
-# Add startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info(f"Unraid MCP Server starting on {HOST}:{PORT}")
-    logger.info(f"API URL: {UNRAID_API_URL}")
-    logger.info("Server ready!")
+@app.get("/dashboard")
+async def get_dashboard():
+    """Get system info, array status and Docker containers in one call"""
+    try:
+        logger.info("Getting dashboard")
+        # Partial data is accepted so one failing root (e.g. docker while Docker is stopped)
+        # does not take down the other sections
+        response_data, errors = await graphql_raw_partial(PAYLOAD_DASHBOARD, cache_ttl=5)
+
+        root_errors: Dict[str, List[str]] = {}
+        for err in errors:
+            path = err.get("path") or [None]
+            root_errors.setdefault(path[0], []).append(err.get("message", str(err)))
+        if root_errors:
+            logger.error(f"Errors in dashboard query: {root_errors}")
+
+        raw_info = response_data.get("info") or {}
+        raw_array_info = response_data.get("array") or {}
+        containers = (response_data.get("docker") or {}).get("containers") or []
+
+        system = {"error": "No system info returned from Unraid API"}
+        if "info" in root_errors:
+            system = {"error": "; ".join(root_errors["info"])}
+        elif raw_info:
+            system = {"summary": summarize_system_info(raw_info), "details": raw_info}
+
+        array = {"error": "No array information returned from Unraid API"}
+        if "array" in root_errors:
+            array = {"error": "; ".join(root_errors["array"])}
+        elif raw_array_info:
+            array = {"summary": summarize_array(raw_array_info), "details": raw_array_info}
+
+        docker = summarize_docker(containers)
+        if "docker" in root_errors:
+            docker = {"error": "; ".join(root_errors["docker"])}
+
+        return {
+            "system": system,
+            "array": array,
+            "docker": docker
+        }
+
+    except Exception as e:
+        logger.error(f"Error in get_dashboard: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve dashboard: {str(e)}")
 
 def main():
     """Main function to run the HTTP server"""
@@ -307,7 +343,7 @@ def main():
         host=HOST,
         port=PORT,
         log_level="info",
-        access_log=True
+        access_log=False
     )
 
 if __name__ == "__main__":
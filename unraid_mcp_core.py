@@ -0,0 +1,383 @@
+"""
+Shared Unraid API client for the MCP servers.
+Holds the GraphQL queries, the pooled HTTP client, response caching and the
+summary helpers used by both the HTTP and stdio transports.
+"""
+import asyncio
+import logging
+import time
+from hashlib import md5, sha256
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+import httpx
+import orjson
+
+logger = logging.getLogger("UnraidMCPServer")
+
+# Shared HTTP client, created by init_client() and reused for every request
+_client: Optional[httpx.AsyncClient] = None
+_api_url: Optional[str] = None
+_http_version_logged = False
+
+def init_client(api_url: str, api_key: str, verify_ssl: Union[bool, str] = True) -> httpx.AsyncClient:
+    """Create the process-wide HTTP client used for all Unraid API requests"""
+    global _client, _api_url, _http_version_logged
+
+    # One client for the whole process so connections are kept alive and reused.
+    # HTTP/2 lets concurrent GraphQL requests share a single connection.
+    _client = httpx.AsyncClient(
+        http2=True,
+        verify=verify_ssl,
+        timeout=30.0,
+        headers={
+            "Content-Type": "application/json",
+            "X-API-Key": api_key,
+        },
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60),
+    )
+    _api_url = api_url
+    _http_version_logged = False
+    return _client
+
+async def close_client() -> None:
+    """Close the shared HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# GraphQL queries, with their request bodies serialized once at import time
+Q_HEALTH = """
+query HealthCheck {
+  info {
+    machineId
+    time
+  }
+}
+"""
+
+Q_SYSTEM_INFO = """
+query GetSystemInfo {
+  info {
+    os { platform distro release hostname uptime }
+    cpu { manufacturer brand cores threads }
+    time
+    machineId
+    versions { unraid }
+  }
+}
+"""
+
+Q_ARRAY = """
+query GetArrayStatus {
+  array {
+    state
+    capacity {
+      kilobytes { free used total }
+    }
+    disks { id name status }
+    parities { id name status }
+  }
+}
+"""
+
+Q_DOCKER = """
+query ListDockerContainers {
+  docker {
+    containers(skipCache: false) {
+      id
+      names
+      image
+      state
+      status
+    }
+  }
+}
+"""
+
+# Port mappings make the response much larger, so they are only fetched on request
+Q_DOCKER_PORTS = """
+query ListDockerContainersWithPorts {
+  docker {
+    containers(skipCache: false) {
+      id
+      names
+      image
+      state
+      status
+      ports { privatePort publicPort type }
+    }
+  }
+}
+"""
+
+# One document selecting all three roots, so the dashboard costs a single request
+Q_DASHBOARD = """
+query Dashboard {
+  info {
+    os { platform distro release hostname uptime }
+    cpu { manufacturer brand cores threads }
+    time
+    machineId
+    versions { unraid }
+  }
+  array {
+    state
+    capacity {
+      kilobytes { free used total }
+    }
+    disks { id name status }
+    parities { id name status }
+  }
+  docker {
+    containers(skipCache: false) {
+      id
+      names
+      image
+      state
+      status
+    }
+  }
+}
+"""
+
+# Automatic Persisted Queries: plain payload -> (sha256 of query, hash-only payload, full payload with hash)
+_APQ_PAYLOADS: Dict[bytes, tuple] = {}
+# Hashes the Unraid API has accepted, so later calls can send just the hash
+_APQ_REGISTERED: set = set()
+_APQ_ENABLED = True
+
+def _prepare_query(query: str) -> bytes:
+    """Serialize a query once and register its persisted-query forms"""
+    qhash = sha256(query.encode()).hexdigest()
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": qhash}}
+    payload = orjson.dumps({"query": query})
+    _APQ_PAYLOADS[payload] = (
+        qhash,
+        orjson.dumps({"extensions": extensions}),
+        orjson.dumps({"query": query, "extensions": extensions}),
+    )
+    return payload
+
+PAYLOAD_HEALTH = _prepare_query(Q_HEALTH)
+PAYLOAD_SYSTEM_INFO = _prepare_query(Q_SYSTEM_INFO)
+PAYLOAD_ARRAY = _prepare_query(Q_ARRAY)
+PAYLOAD_DOCKER = _prepare_query(Q_DOCKER)
+PAYLOAD_DOCKER_PORTS = _prepare_query(Q_DOCKER_PORTS)
+PAYLOAD_DASHBOARD = _prepare_query(Q_DASHBOARD)
+
+# In-process response cache: key -> (monotonic timestamp, data)
+_CACHE: Dict[str, tuple] = {}
+# Upstream requests currently running, so identical concurrent calls share one
+_INFLIGHT: Dict[str, asyncio.Task] = {}
+
+async def graphql(query: str, variables: Optional[Dict[str, Any]] = None, *, cache_ttl: float = 0) -> Dict[str, Any]:
+    """Make a GraphQL request, serving from cache if fetched within cache_ttl seconds."""
+    payload = {"query": query}
+    if variables:
+        payload["variables"] = variables
+
+    return await graphql_raw(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), cache_ttl=cache_ttl)
+
+async def graphql_raw(payload: bytes, *, cache_ttl: float = 0) -> Dict[str, Any]:
+    """Make a GraphQL request from an already serialized request body."""
+    response_data = await _request(payload, cache_ttl)
+    if response_data.get("errors"):
+        raise Exception(f"GraphQL API error: {_error_details(response_data['errors'])}")
+
+    return response_data.get("data", {})
+
+async def graphql_raw_partial(payload: bytes, *, cache_ttl: float = 0) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Like graphql_raw, but return (data, errors) when some root fields resolved."""
+    response_data = await _request(payload, cache_ttl)
+    errors = response_data.get("errors") or []
+    data = response_data.get("data")
+    if data is None and errors:
+        raise Exception(f"GraphQL API error: {_error_details(errors)}")
+
+    return data or {}, errors
+
+def _error_details(errors: List[Dict[str, Any]]) -> str:
+    return "; ".join([err.get("message", str(err)) for err in errors])
+
+async def _request(payload: bytes, cache_ttl: float) -> Dict[str, Any]:
+    """Fetch the full GraphQL response, from cache or a shared in-flight request"""
+    key = md5(payload).hexdigest()
+    if cache_ttl > 0:
+        cached = _CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < cache_ttl:
+            return cached[1]
+
+    # Only one request per key goes upstream; concurrent callers await the same task
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_cache(payload, key, cache_ttl))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+
+    # Shield so one caller being cancelled does not cancel the request for the others
+    return await asyncio.shield(task)
+
+async def _fetch_and_cache(payload: bytes, key: str, cache_ttl: float) -> Dict[str, Any]:
+    response_data = await _fetch_graphql(payload)
+    # Responses carrying errors are not cached, so a failing resolver is retried next call
+    if cache_ttl > 0 and not response_data.get("errors"):
+        _CACHE[key] = (time.monotonic(), response_data)
+    return response_data
+
+async def _post_graphql(payload: bytes) -> httpx.Response:
+    """POST a serialized request body to the Unraid API"""
+    global _http_version_logged
+    logger.debug(f"Making GraphQL request to {_api_url}")
+
+    # Content-Type and X-API-Key are default headers on the shared client
+    response = await _client.post(_api_url, content=payload)
+    if not _http_version_logged:
+        logger.info(f"Unraid API negotiated {response.http_version}")
+        _http_version_logged = True
+    return response
+
+def _decode(response: httpx.Response) -> Optional[Any]:
+    """Parse a response body once, or None if it is not JSON"""
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return None
+
+def _persisted_query_error(response_data: Optional[Any], hash_only: bool) -> Optional[str]:
+    """Classify a persisted-query rejection: 'not_found', 'unsupported', or None for anything else"""
+    errors = response_data.get("errors") if isinstance(response_data, dict) else None
+    for err in errors or ():
+        message = err.get("message") or ""
+        code = (err.get("extensions") or {}).get("code")
+        if message == "PersistedQueryNotFound" or code == "PERSISTED_QUERY_NOT_FOUND":
+            return "not_found"
+        if message == "PersistedQueryNotSupported" or code == "PERSISTED_QUERY_NOT_SUPPORTED":
+            return "unsupported"
+        # Servers without APQ support reject a hash-only body as having no query
+        if hash_only and "must provide query string" in message.lower():
+            return "unsupported"
+    return None
+
+def _disable_apq() -> None:
+    global _APQ_ENABLED
+    logger.warning("Unraid API does not support persisted queries, sending full queries")
+    _APQ_ENABLED = False
+    _APQ_REGISTERED.clear()
+
+async def _fetch_graphql(payload: bytes) -> Dict[str, Any]:
+    """Helper function to make GraphQL requests to the Unraid API."""
+    apq = _APQ_PAYLOADS.get(payload) if _APQ_ENABLED else None
+    response = None
+
+    # Each response body is decoded once and reused for the APQ checks and the result
+    if apq and apq[0] in _APQ_REGISTERED:
+        response = await _post_graphql(apq[1])
+        response_data = _decode(response)
+        rejection = _persisted_query_error(response_data, hash_only=True)
+        if rejection == "not_found":
+            # Server forgot the hash (e.g. restarted); re-register it with the full body below
+            _APQ_REGISTERED.discard(apq[0])
+            response = None
+        elif rejection == "unsupported":
+            _disable_apq()
+            apq = None
+            response = None
+
+    if response is None and apq:
+        response = await _post_graphql(apq[2])
+        response_data = _decode(response)
+        if _persisted_query_error(response_data, hash_only=False) == "unsupported":
+            _disable_apq()
+            apq = None
+            response = None
+        elif not response.is_error:
+            _APQ_REGISTERED.add(apq[0])
+
+    if response is None:
+        response = await _post_graphql(payload)
+        response_data = _decode(response)
+    response.raise_for_status()
+
+    if response_data is None:
+        # Not JSON: decode again only to surface the parser error
+        return orjson.loads(response.content)
+    return response_data
+
+# (divisor, suffix) pairs for sizes expressed in kilobytes, largest first
+_KB_UNITS = ((1 << 30, "TB"), (1 << 20, "GB"), (1 << 10, "MB"))
+
+def format_kb(k):
+    """Format a kilobyte count as a human-readable size"""
+    if k is None: return "N/A"
+    k = int(k)
+    for divisor, suffix in _KB_UNITS:
+        if k >= divisor:
+            return f"{k / divisor:.2f} {suffix}"
+    return f"{k} KB"
+
+def summarize_system_info(raw_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the human-readable summary for system information"""
+    summary = {}
+    os_info = raw_info.get('os')
+    if os_info:
+        distro = os_info.get('distro') or ''
+        release = os_info.get('release') or ''
+        platform = os_info.get('platform') or ''
+        summary = {
+            'os': f"{distro} {release} ({platform})",
+            'hostname': os_info.get('hostname'),
+            'uptime': os_info.get('uptime')
+        }
+
+    cpu_info = raw_info.get('cpu')
+    if cpu_info:
+        manufacturer = cpu_info.get('manufacturer') or ''
+        brand = cpu_info.get('brand') or ''
+        summary['cpu'] = f"{manufacturer} {brand} ({cpu_info.get('cores')} cores, {cpu_info.get('threads')} threads)"
+
+    versions = raw_info.get('versions')
+    if versions:
+        summary['unraid_version'] = versions.get('unraid')
+
+    return summary
+
+def summarize_array(raw_array_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the human-readable summary for array status"""
+    capacity = raw_array_info.get('capacity')
+    kb_cap = capacity.get('kilobytes') if capacity else None
+
+    summary = {
+        'state': raw_array_info.get('state'),
+        'num_data_disks': len(raw_array_info.get('disks') or ()),
+        'num_parity_disks': len(raw_array_info.get('parities') or ())
+    }
+
+    # Add capacity info if available
+    if kb_cap:
+        summary['capacity'] = {
+            'total': format_kb(kb_cap.get('total')),
+            'used': format_kb(kb_cap.get('used')),
+            'free': format_kb(kb_cap.get('free'))
+        }
+
+    return summary
+
+def summarize_docker(containers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the container list response with running/stopped counts"""
+    running = stopped = 0
+    for c in containers:
+        state = c.get("state")
+        if state == "running":
+            running += 1
+        elif state == "exited":
+            stopped += 1
+
+    return {
+        "summary": {
+            "total": len(containers),
+            "running": running,
+            "stopped": stopped
+        },
+        "containers": containers
+    }